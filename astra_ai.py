@@ -1,14 +1,145 @@
 # astra_ai.py
+import io
 import os
+import re
 import json
 import ollama
 from rich.console import Console
-from typing import List, Dict, Optional, Tuple, Any
-from PyPDF2 import PdfReader
+from typing import List, Dict, Optional, Tuple, Any, Union, Iterator
+import fitz
 from docx import Document
 
 console = Console()
 
+# Document preview size for chat prompts, adjusted for small models' context windows
+_PREVIEW_CHARS = 1500
+
+# Document text used for quiz prompts
+_QUIZ_CONTEXT_CHARS = 2000
+
+# Only this much document text is ever sent to the model, so nothing more is kept
+_MAX_CONTEXT_CHARS = 2048
+
+# Context window for every Ollama request, in tokens. Ollama reloads the model
+# whenever num_ctx changes, so every request must use the same value. 2048 keeps
+# the KV cache small; prompts are kept inside it by budgeting characters below
+# rather than by growing the window.
+_NUM_CTX = 2048
+
+# How long Ollama keeps the model loaded after a request. It is applied per
+# request and falls back to 5 minutes when omitted, so every call must pass it
+_KEEP_ALIVE = "30m"
+
+# Tokens held back from num_ctx for the model's reply
+_OUTPUT_TOKENS = 512
+
+# Conservative characters-per-token ratio (English averages closer to 4), so the
+# character budget overestimates token use rather than overflowing
+_CHARS_PER_TOKEN = 3
+
+# Characters a whole prompt (system, document preview, history, question) may use:
+# (2048 - 512) * 3 = 4608. The quiz prompt (~2700 chars including the 2000-char
+# excerpt) fits with room for about ten questions of output
+_PROMPT_CHAR_BUDGET = (_NUM_CTX - _OUTPUT_TOKENS) * _CHARS_PER_TOKEN
+
+# Words that end the conversation when they appear in a question
+_END_PHRASES = frozenset({'goodbye', 'bye', 'exit', 'quit', 'end'})
+
+# Line grammar for LLM quiz output; match.lastgroup names the line type.
+# Matched with finditer over the whole response, so unrecognized lines are skipped in C
+_QUIZ_RE = re.compile(
+    r'^[ \t]*(?:\d+\.[ \t]+(?P<question>.+)'
+    r'|(?P<letter>[ABCD])\)[ \t]+(?P<option>.+)'
+    r'|CORRECT:[ \t]*(?P<correct>[ABCD])'
+    r'|EXPLANATION:[ \t]*(?P<explanation>.+))[ \t\r]*$',
+    re.MULTILINE
+)
+
+
+def _read_txt(data: bytes) -> str:
+    """Decode text file content with proper encoding handling"""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        # latin-1 maps every byte, so decoding always succeeds
+        return data.decode('latin-1')
+
+
+def _read_pdf(data: bytes) -> Tuple[str, bool]:
+    """
+    Read PDF file content with enhanced error handling
+
+    Returns:
+        Tuple[str, bool]: Extracted text, and whether every page was read
+    """
+    doc = None
+    try:
+        doc = fitz.open(stream=data, filetype="pdf")
+
+        # Only the first _MAX_CONTEXT_CHARS are ever kept, so stop reading pages
+        # once that much text has been extracted
+        text = []
+        length = 0
+        for page in doc:
+            content = page.get_text("text")
+            text.append(content)
+            length += len(content) + 1
+            if length >= _MAX_CONTEXT_CHARS:
+                break
+        return "\n".join(text), len(text) == doc.page_count
+    except Exception as e:
+        raise ValueError(f"PDF reading error: {str(e)}")
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+def _read_docx(data: bytes) -> str:
+    """Read DOCX file content with paragraph spacing"""
+    try:
+        doc = Document(io.BytesIO(data))
+        paragraphs = (paragraph.text for paragraph in doc.paragraphs)
+        return "\n\n".join(text for text in paragraphs if text and not text.isspace())
+    except Exception as e:
+        raise ValueError(f"DOCX reading error: {str(e)}")
+
+
+def extract_text(file_name: str, data: bytes) -> Tuple[str, Optional[int]]:
+    """
+    Extract text content from a document based on file type
+
+    Only the first _MAX_CONTEXT_CHARS characters are returned, since nothing
+    past that is ever sent to the model.
+
+    Args:
+        file_name (str): Name of the document, used to pick the reader
+        data (bytes): Raw document bytes
+
+    Returns:
+        Tuple[str, Optional[int]]: Truncated text, and the full text length in
+            characters (None when a PDF was only partially read)
+
+    Raises:
+        ValueError: If the file type is unsupported or no text can be extracted
+    """
+    file_extension = os.path.splitext(file_name)[1].lower()
+
+    complete = True
+    if file_extension == '.txt':
+        content = _read_txt(data)
+    elif file_extension == '.pdf':
+        content, complete = _read_pdf(data)
+    elif file_extension == '.docx':
+        content = _read_docx(data)
+    else:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+
+    # Basic content validation
+    if not content.strip():
+        raise ValueError("Document appears to be empty")
+
+    return content[:_MAX_CONTEXT_CHARS], len(content) if complete else None
+
 
 class AstraAI:
     """ASTRA AI Study Assistant Class"""
@@ -16,18 +147,24 @@ class AstraAI:
     def __init__(self) -> None:
         """Initialize all class attributes"""
         # Model configuration
-        self.model: str = "llama3.2"  # Specify exact model version
+        # Q4_K_M quantization roughly halves the bytes streamed per decoded token;
+        # override with ASTRA_MODEL to use a different Ollama tag
+        self.model: str = os.environ.get("ASTRA_MODEL", "llama3.2:3b-instruct-q4_K_M")
 
         # Conversation state
         self.conversation_active: bool = True
         self.chat_history: List[Dict[str, str]] = []
+        # Start of the history slice sent to the model; only moves when the window is reset
+        self._window_start: int = 0
 
         # Document handling
         self.context: str = ""
         self.document_name: Optional[str] = None
+        self._context_preview: str = ""
+        self._quiz_context: str = ""
 
-        # Console for logging
-        self.console: Console = Console()
+        # Console for logging, shared across instances
+        self.console: Console = console
 
         # Quiz-related attributes
         self.quiz_active: bool = False
@@ -35,38 +172,43 @@ class AstraAI:
         self.quiz_progress: int = 0
         self.quiz_score: int = 0
         self.total_questions: int = 0
+        self._current_streak: int = 0
 
         # Error handling
         self.last_error: Optional[str] = None
 
-    def load_document(self, file_path: str) -> str:
+    def warm_up(self) -> None:
+        """Load the model into Ollama ahead of the first question so it skips the cold start"""
+        try:
+            # An empty prompt only loads the model; keep_alive keeps it resident. It must
+            # load with the same num_ctx as real requests or the first one reloads it
+            ollama.generate(model=self.model, prompt="", keep_alive=_KEEP_ALIVE, options={"num_ctx": _NUM_CTX})
+        except Exception as e:
+            self.console.print(f"[yellow]Model warm-up failed: {str(e)}[/yellow]")
+
+    def load_document(self, source: Union[str, Tuple[str, bytes]]) -> str:
         """
         Load and process document content based on file type
 
         Args:
-            file_path (str): Path to the document file
+            source (Union[str, Tuple[str, bytes]]): Path to the document file, or a
+                (file name, file bytes) pair to parse in memory without touching disk
 
         Returns:
-            str: Extracted text content from the document
+            str: Extracted text content, truncated to what the prompts use
         """
         try:
-            self.document_name = os.path.basename(file_path)
-            file_extension = os.path.splitext(file_path)[1].lower()
-
-            content = ""
-            if file_extension == '.txt':
-                content = self._read_txt(file_path)
-            elif file_extension == '.pdf':
-                content = self._read_pdf(file_path)
-            elif file_extension == '.docx':
-                content = self._read_docx(file_path)
+            if isinstance(source, tuple):
+                file_path, data = source
             else:
-                raise ValueError(f"Unsupported file type: {file_extension}")
+                file_path = source
+                with open(file_path, 'rb') as file:
+                    data = file.read()
 
-            # Basic content validation
-            if not content.strip():
-                raise ValueError("Document appears to be empty")
+            self.document_name = os.path.basename(file_path)
+            content, _ = extract_text(self.document_name, data)
 
+            self.set_context(content, self.document_name)
             return content
 
         except Exception as e:
@@ -74,38 +216,23 @@ class AstraAI:
             self.console.print(f"[red]Error loading document: {str(e)}[/red]")
             return ""
 
-    def _read_txt(self, file_path: str) -> str:
-        """Read text file content with proper encoding handling"""
-        encodings = ['utf-8', 'latin-1', 'cp1252']
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    return file.read()
-            except UnicodeDecodeError:
-                continue
-        raise ValueError("Unable to decode file with supported encodings")
-
-    def _read_pdf(self, file_path: str) -> str:
-        """Read PDF file content with enhanced error handling"""
-        try:
-            text = []
-            with open(file_path, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                for page in pdf_reader.pages:
-                    content = page.extract_text()
-                    if content:
-                        text.append(content)
-            return "\n".join(text)
-        except Exception as e:
-            raise ValueError(f"PDF reading error: {str(e)}")
+    def set_context(self, content: str, document_name: Optional[str]) -> None:
+        """
+        Set the document context and precompute the prompt slices
 
-    def _read_docx(self, file_path: str) -> str:
-        """Read DOCX file content with paragraph spacing"""
-        try:
-            doc = Document(file_path)
-            return "\n\n".join([paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip()])
-        except Exception as e:
-            raise ValueError(f"DOCX reading error: {str(e)}")
+        Only the prefix the prompts use is stored, so session memory stays flat
+        regardless of document size. The previews are sliced once here so every
+        chat request sends the exact same document prefix, letting Ollama reuse
+        its cached prefill.
+
+        Args:
+            content (str): Extracted document text
+            document_name (Optional[str]): Name of the source document
+        """
+        self.context = content[:_MAX_CONTEXT_CHARS]
+        self.document_name = document_name
+        self._context_preview = self.context[:_PREVIEW_CHARS]
+        self._quiz_context = self.context[:_QUIZ_CONTEXT_CHARS]
 
     def ask_question(self, question: str) -> str:
         """
@@ -117,37 +244,49 @@ class AstraAI:
         Returns:
             str: AI-generated response
         """
+        return "".join(self.ask_question_stream(question))
+
+    def ask_question_stream(self, question: str) -> Iterator[str]:
+        """
+        Process user question and stream the response as it is generated
+
+        Args:
+            question (str): User's question
+
+        Yields:
+            str: Chunks of the AI-generated response
+        """
+        chunks = []
         try:
             if not question.strip():
-                return "Please ask a valid question."
+                yield "Please ask a valid question."
+                return
 
             if self._should_end_conversation(question):
                 self.conversation_active = False
-                return "Goodbye! Feel free to start a new conversation when you need help!"
+                yield "Goodbye! Feel free to start a new conversation when you need help!"
+                return
 
             messages = self._prepare_messages(question)
-            response = self._generate_response(messages)
-            self._update_chat_history(question, response)
+            for chunk in self._generate_response(messages, stream=True):
+                chunks.append(chunk)
+                yield chunk
 
-            return response
+            self._update_chat_history(question, "".join(chunks))
 
         except Exception as e:
             self.last_error = str(e)
             error_msg = "I apologize, but I encountered an error processing your question. Please try again."
             self.console.print(f"[red]Error: {str(e)}[/red]")
-            return error_msg
+            # Set the error apart from any partial answer already streamed
+            yield f"\n\n{error_msg}" if chunks else error_msg
 
     def _should_end_conversation(self, question: str) -> bool:
         """Check if the conversation should end based on user input"""
-        end_phrases = {'goodbye', 'bye', 'exit', 'quit', 'end'}
-        return any(phrase in question.lower().split() for phrase in end_phrases)
+        return not _END_PHRASES.isdisjoint(question.lower().split())
 
     def _prepare_messages(self, question: str) -> List[Dict[str, str]]:
         """Prepare messages for the chat model with improved context handling"""
-        # Limit context size based on model's context window
-        max_context = 1500  # Adjusted for TinyLlama's context window
-        context_preview = self.context[:max_context] if self.context else ""
-
         system_message = {
             "role": "system",
             "content": """You are ASTRA AI, a helpful study assistant. Keep responses concise and relevant.
@@ -157,13 +296,12 @@ class AstraAI:
 
         messages = [system_message]
 
-        # Add recent chat history for context
-        messages.extend(self.chat_history[-3:])  # Last 3 exchanges for context
-
-        if context_preview and self.document_name:
+        # Document context always goes right after the static system prompt so
+        # the cached prefix survives across turns
+        if self._context_preview and self.document_name:
             messages.append({
                 "role": "system",
-                "content": f"Using content from document: {self.document_name}\n\n{context_preview}"
+                "content": f"Using content from document: {self.document_name}\n\n{self._context_preview}"
             })
 
         messages.append({
@@ -171,25 +309,64 @@ class AstraAI:
             "content": question
         })
 
+        # Chat history goes between the document context and the question as an
+        # append-only window, so consecutive requests share the same message prefix.
+        # It gets whatever is left of _PROMPT_CHAR_BUDGET. When it outgrows that,
+        # the window restarts with the newest exchanges that fill half the budget.
+        # That leaves room for several more turns before the prefix shifts again,
+        # and keeps the prompt from overflowing num_ctx, where Ollama would trim it.
+        history_budget = _PROMPT_CHAR_BUDGET - sum(len(message['content']) for message in messages)
+        window = self.chat_history[self._window_start:]
+        window_chars = sum(len(message['content']) for message in window)
+        if window_chars > history_budget:
+            # History holds user/assistant pairs, so drop whole exchanges
+            while window and window_chars > history_budget // 2:
+                window_chars -= len(window[0]['content']) + len(window[1]['content'])
+                window = window[2:]
+                self._window_start += 2
+
+        messages[-1:-1] = window
         return messages
 
-    def _generate_response(self, messages: List[Dict[str, str]]) -> str:
-        """Generate response using Ollama with enhanced error handling"""
+    def _generate_response(self, messages: List[Dict[str, str]],
+                           stream: bool = False) -> Union[str, Iterator[str]]:
+        """
+        Generate response using Ollama with enhanced error handling
+
+        Args:
+            messages (List[Dict[str, str]]): Messages to send to the model
+            stream (bool): Return an iterator of content chunks instead of the full text
+
+        Returns:
+            Union[str, Iterator[str]]: Full response text, or its chunks when streaming
+        """
         try:
             response = ollama.chat(
                 model=self.model,
                 messages=messages,
                 options={
                     "temperature": 0.7,
-                    "num_ctx": 2048,
+                    "num_ctx": _NUM_CTX,
                     "top_p": 0.9,
                     "top_k": 40,
-                }
+                },
+                stream=stream,
+                keep_alive=_KEEP_ALIVE
             )
+            if stream:
+                return self._stream_chunks(response)
             return response['message']['content']
         except Exception as e:
             raise RuntimeError(f"Error generating response: {str(e)}")
 
+    def _stream_chunks(self, response: Iterator[Dict[str, Any]]) -> Iterator[str]:
+        """Yield content from a streamed Ollama response, wrapping errors raised mid-stream"""
+        try:
+            for chunk in response:
+                yield chunk['message']['content']
+        except Exception as e:
+            raise RuntimeError(f"Error generating response: {str(e)}")
+
     def _update_chat_history(self, question: str, response: str) -> None:
         """Update chat history with message validation"""
         if question.strip() and response.strip():
@@ -199,9 +376,9 @@ class AstraAI:
     def reset_conversation(self) -> None:
         """Reset all conversation and quiz state"""
         self.chat_history = []
+        self._window_start = 0
         self.conversation_active = True
-        self.context = ""
-        self.document_name = None
+        self.set_context("", None)
         self.end_quiz()
         self.last_error = None
 
@@ -212,6 +389,7 @@ class AstraAI:
         self.quiz_progress = 0
         self.quiz_score = 0
         self.total_questions = 0
+        self._current_streak = 0
 
     def generate_quiz(self, num_questions: int = 5) -> bool:
         """
@@ -232,7 +410,7 @@ class AstraAI:
             prompt = f"""Generate {num_questions} multiple choice questions based on this text. 
             Make questions that test understanding of key concepts.
 
-            Text for quiz: {self.context[:2000]}...
+            Text for quiz: {self._quiz_context}...
 
             Format each question exactly like this example:
 
@@ -247,20 +425,23 @@ class AstraAI:
             Generate {num_questions} questions in exactly this format, numbered from 1 to {num_questions}.
             """
 
+            messages = [{
+                "role": "system",
+                "content": "You are a quiz generator. Generate clear, focused questions with exactly four options (A, B, C, D). Provide the correct answer and explanation for each question."
+            }, {
+                "role": "user",
+                "content": prompt
+            }]
+
             # Generate quiz content
             response = ollama.chat(
                 model=self.model,
-                messages=[{
-                    "role": "system",
-                    "content": "You are a quiz generator. Generate clear, focused questions with exactly four options (A, B, C, D). Provide the correct answer and explanation for each question."
-                }, {
-                    "role": "user",
-                    "content": prompt
-                }],
+                messages=messages,
                 options={
                     "temperature": 0.7,
-                    "num_ctx": 2048,
-                }
+                    "num_ctx": _NUM_CTX,
+                },
+                keep_alive=_KEEP_ALIVE
             )
 
             # Parse the response into structured quiz format
@@ -275,6 +456,7 @@ class AstraAI:
             self.quiz_progress = 0
             self.quiz_score = 0
             self.total_questions = len(quiz_questions)
+            self._current_streak = 0
             return True
 
         except Exception as e:
@@ -296,92 +478,52 @@ class AstraAI:
             questions = []
             current_question = None
 
-            # Split response into lines and process
-            lines = response_text.strip().split('\n')
-
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
+            # A question is only kept once its EXPLANATION line closes it; a new
+            # question header simply discards any unfinished one
+            def start_question(match: re.Match) -> None:
+                nonlocal current_question
+                current_question = {
+                    'question': match['question'].strip(),
+                    'options': {},
+                    'correct': None,
+                    'explanation': None
+                }
 
-                # New question starts with a number
-                if line[0].isdigit() and '. ' in line:
-                    if current_question:
+            def add_option(match: re.Match) -> None:
+                if current_question:
+                    current_question['options'][match['letter']] = match['option'].strip()
+
+            def set_correct(match: re.Match) -> None:
+                if current_question:
+                    current_question['correct'] = match['correct']
+
+            def set_explanation(match: re.Match) -> None:
+                nonlocal current_question
+                if current_question:
+                    current_question['explanation'] = match['explanation'].strip()
+                    # The regex only admits A-D, so four options means all four are present
+                    if (len(current_question['options']) == 4 and current_question['correct']
+                            and current_question['question'] and current_question['explanation']):
                         questions.append(current_question)
-                    current_question = {
-                        'question': line.split('. ', 1)[1],
-                        'options': {},
-                        'correct': None,
-                        'explanation': None
-                    }
-
-                # Option line
-                elif line[0] in 'ABCD' and ') ' in line:
-                    option, text = line.split(') ', 1)
-                    if current_question:
-                        current_question['options'][option] = text.strip()
-
-                # Correct answer line
-                elif line.startswith('CORRECT:'):
-                    if current_question:
-                        current_question['correct'] = line.split(':', 1)[1].strip()
-
-                # Explanation line
-                elif line.startswith('EXPLANATION:'):
-                    if current_question:
-                        current_question['explanation'] = line.split(':', 1)[1].strip()
-                        questions.append(current_question)
-                        current_question = None
+                    current_question = None
 
-            # Add last question if exists
-            if current_question and current_question['explanation']:
-                questions.append(current_question)
+            handlers = {
+                'question': start_question,
+                'option': add_option,
+                'correct': set_correct,
+                'explanation': set_explanation,
+            }
 
-            # Validate questions
-            valid_questions = []
-            for q in questions:
-                if self._validate_question(q):
-                    valid_questions.append(q)
+            # Single pass over the recognized lines, dispatching on the line type
+            for match in _QUIZ_RE.finditer(response_text):
+                handlers[match.lastgroup](match)
 
-            return valid_questions
+            return questions
 
         except Exception as e:
             self.console.print(f"[red]Error parsing quiz response: {str(e)}[/red]")
             return []
 
-    def _validate_question(self, question: Dict) -> bool:
-        """
-        Validate a single quiz question
-
-        Args:
-            question (Dict): Question dictionary to validate
-
-        Returns:
-            bool: True if question is valid, False otherwise
-        """
-        try:
-            # Check required fields
-            required_fields = ['question', 'options', 'correct', 'explanation']
-            if not all(field in question for field in required_fields):
-                return False
-
-            # Validate options
-            if not all(opt in question['options'] for opt in ['A', 'B', 'C', 'D']):
-                return False
-
-            # Validate correct answer
-            if question['correct'] not in ['A', 'B', 'C', 'D']:
-                return False
-
-            # Validate content
-            if not question['question'] or not question['explanation']:
-                return False
-
-            return True
-
-        except Exception:
-            return False
-
     def get_current_question(self) -> Optional[Dict[str, Any]]:
         """Get current quiz question with formatted output"""
         if not self.quiz_active or self.quiz_progress >= len(self.current_quiz):
@@ -409,6 +551,7 @@ class AstraAI:
             return False, "Invalid answer option"
 
         is_correct = answer == current_question['correct']
+        self._current_streak = self._current_streak + 1 if is_correct else 0
         if is_correct:
             self.quiz_score += 1
 
@@ -439,13 +582,4 @@ class AstraAI:
 
     def _calculate_current_streak(self) -> int:
         """Calculate the current streak of correct answers"""
-        streak = 0
-        for i in range(self.quiz_progress - 1, -1, -1):
-            if hasattr(self, '_answer_history') and len(self._answer_history) > i:
-                if self._answer_history[i]:
-                    streak += 1
-                else:
-                    break
-            else:
-                break
-        return streak
\ No newline at end of file
+        return self._current_streak
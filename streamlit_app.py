@@ -1,14 +1,17 @@
 # streamlit_app.py
-import os
-import tempfile
+import hashlib
+import threading
+from typing import Optional, Tuple
 import streamlit as st
-from astra_ai import AstraAI
+from astra_ai import AstraAI, extract_text
 
 
 def initialize_session_state():
     """Initialize or reset session state variables"""
     if 'astra' not in st.session_state:
         st.session_state.astra = AstraAI()
+        # Load the model in the background so the first question doesn't pay for it
+        threading.Thread(target=st.session_state.astra.warm_up, daemon=True).start()
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     if 'current_mode' not in st.session_state:
@@ -17,6 +20,16 @@ def initialize_session_state():
         st.session_state.document_loaded = False
 
 
+@st.cache_data(max_entries=8, show_spinner=False)
+def _parse_uploaded_bytes(name: str, digest: str, _data: bytes) -> Tuple[str, Optional[int]]:
+    """
+    Extract text from uploaded file bytes, cached on file name and content digest
+    so Streamlit reruns don't re-parse the same document
+    """
+    # Parse straight from memory; failures raise, which keeps them out of the cache
+    return extract_text(name, _data)
+
+
 def handle_file_upload(uploaded_file):
     """
     Handle document upload with improved error handling and validation
@@ -31,48 +44,33 @@ def handle_file_upload(uploaded_file):
             st.error("❌ The uploaded file is empty")
             return False
 
-        # Create temp directory if it doesn't exist
-        temp_dir = tempfile.mkdtemp()
+        data = uploaded_file.getvalue()
+        digest = hashlib.blake2b(data).hexdigest()
 
+        # Attempt to load document
         try:
-            # Save uploaded file to temp location
-            temp_file_path = os.path.join(temp_dir, uploaded_file.name)
-
-            with open(temp_file_path, "wb") as f:
-                f.write(uploaded_file.getvalue())
-
-            # Attempt to load document
             with st.spinner("Processing document..."):
-                content = st.session_state.astra.load_document(temp_file_path)
-
-            # Clean up temp file
-            os.unlink(temp_file_path)
-            os.rmdir(temp_dir)
-
-            if not content:
-                if st.session_state.astra.last_error:
-                    st.error(f"❌ Error processing document: {st.session_state.astra.last_error}")
-                else:
-                    st.error("❌ Could not extract content from the document")
-                return False
-
-            # Update session state
-            st.session_state.astra.context = content
-            st.session_state.document_loaded = True
-
-            # Show success message with document details
-            st.success(f"""✅ Document loaded successfully!
-                         \nFile: {uploaded_file.name}
-                         \nSize: {format_file_size(file_size)}
-                         \nContent length: {len(content)} characters""")
-            return True
-
-        finally:
-            # Ensure cleanup of temp files
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+                content, content_length = _parse_uploaded_bytes(uploaded_file.name, digest, data)
+        except ValueError as e:
+            st.session_state.astra.last_error = str(e)
+            st.error(f"❌ Error processing document: {str(e)}")
+            return False
+
+        # Update session state
+        st.session_state.astra.set_context(content, uploaded_file.name)
+        st.session_state.document_loaded = True
+
+        # Show success message with document details
+        # Large PDFs are only read up to the context limit, so their full length is unknown
+        if content_length is None:
+            length_text = f"at least {len(content)} characters"
+        else:
+            length_text = f"{content_length} characters"
+        st.success(f"""✅ Document loaded successfully!
+                     \nFile: {uploaded_file.name}
+                     \nSize: {format_file_size(file_size)}
+                     \nContent length: {length_text}""")
+        return True
 
     except Exception as e:
         st.error(f"❌ Error uploading document: {str(e)}")
@@ -110,10 +108,9 @@ def render_chat_interface():
 
         # Generate and display assistant response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = st.session_state.astra.ask_question(prompt)
-                st.markdown(response)
-                st.session_state.messages.append({"role": "assistant", "content": response})
+            # Stream tokens as they arrive instead of waiting for the full reply
+            response = st.write_stream(st.session_state.astra.ask_question_stream(prompt))
+            st.session_state.messages.append({"role": "assistant", "content": response})
 
         # Check conversation state
         if not st.session_state.astra.conversation_active:
@@ -189,62 +186,68 @@ def render_quiz_interface():
                 st.subheader(f"Question {status['progress'] + 1}")
                 st.write(question['question'])
 
-                # Options with improved visual formatting
-                option_cols = st.columns(2)
-                for i, (key, value) in enumerate(question['options'].items()):
-                    with option_cols[i // 2]:
-                        if st.button(
-                                f"{key}) {value}",
-                                key=f"option_{key}",
-                                use_container_width=True,
-                                # Add some CSS styling for better button appearance
-                                help=f"Select option {key}"
-                        ):
-                            # Handle answer submission
-                            is_correct, explanation = st.session_state.astra.submit_answer(key)
-
-                            if is_correct:
-                                st.success("✅ Correct! 🎉")
-                                if status.get('current_streak', 0) >= 2:
-                                    st.balloons()
-                            else:
-                                st.error("❌ Incorrect!")
-
-                            # Show explanation in an expander
-                            with st.expander("📝 Explanation", expanded=True):
-                                st.write(explanation)
-
-                            # Quiz completion
-                            if not st.session_state.astra.quiz_active:
-                                st.balloons()
-                                st.success("🎓 Quiz completed!")
-
-                                # Final score card
-                                score_cols = st.columns(3)
-                                with score_cols[0]:
-                                    st.metric("Final Score", f"{status['score']}/{status['total_questions']}")
-                                with score_cols[1]:
-                                    st.metric("Final Percentage", f"{status['percentage']}%")
-                                with score_cols[2]:
-                                    if status.get('current_streak', 0) > 0:
-                                        st.metric("Final Streak", str(status['current_streak']))
-
-                                # Achievement messages
-                                if status['percentage'] == 100:
-                                    st.success("🏆 Perfect Score! Excellent work!")
-                                elif status['percentage'] >= 80:
-                                    st.success("🌟 Great job! You've mastered this material!")
-                                elif status['percentage'] >= 60:
-                                    st.info("👍 Good effort! Keep practicing to improve!")
-
-                                # Option to start new quiz
-                                if st.button("Start New Quiz", type="primary"):
-                                    st.rerun()
-                            else:
-                                # Continue to next question
-                                st.write("---")
-                                if st.button("Next Question ➡️", type="primary"):
-                                    st.rerun()
+                # Options are collected in a form so picking one doesn't trigger a rerun;
+                # the script only reruns once the answer is submitted
+                with st.form(key=f"q_{status['progress']}"):
+                    choice = st.radio(
+                        "Choose your answer",
+                        options=list(question['options'].keys()),
+                        format_func=lambda key: f"{key}) {question['options'][key]}",
+                        index=None
+                    )
+                    submitted = st.form_submit_button("Submit", type="primary", use_container_width=True)
+
+                if submitted and choice is None:
+                    st.warning("Please select an answer before submitting.")
+                elif submitted:
+                    # Handle answer submission
+                    is_correct, explanation = st.session_state.astra.submit_answer(choice)
+
+                    if is_correct:
+                        st.success("✅ Correct! 🎉")
+                        if status.get('current_streak', 0) >= 2:
+                            st.balloons()
+                    else:
+                        st.error("❌ Incorrect!")
+
+                    # Show explanation in an expander
+                    with st.expander("📝 Explanation", expanded=True):
+                        st.write(explanation)
+
+                    # Quiz completion
+                    if not st.session_state.astra.quiz_active:
+                        st.balloons()
+                        st.success("🎓 Quiz completed!")
+
+                        # Refresh so the final card includes the answer just submitted
+                        status = st.session_state.astra.get_quiz_status()
+
+                        # Final score card
+                        score_cols = st.columns(3)
+                        with score_cols[0]:
+                            st.metric("Final Score", f"{status['score']}/{status['total_questions']}")
+                        with score_cols[1]:
+                            st.metric("Final Percentage", f"{status['percentage']}%")
+                        with score_cols[2]:
+                            if status.get('current_streak', 0) > 0:
+                                st.metric("Final Streak", str(status['current_streak']))
+
+                        # Achievement messages
+                        if status['percentage'] == 100:
+                            st.success("🏆 Perfect Score! Excellent work!")
+                        elif status['percentage'] >= 80:
+                            st.success("🌟 Great job! You've mastered this material!")
+                        elif status['percentage'] >= 60:
+                            st.info("👍 Good effort! Keep practicing to improve!")
+
+                        # Option to start new quiz
+                        if st.button("Start New Quiz", type="primary"):
+                            st.rerun()
+                    else:
+                        # Continue to next question
+                        st.write("---")
+                        if st.button("Next Question ➡️", type="primary"):
+                            st.rerun()
 
         # Show streak milestone messages
         if status.get('current_streak', 0) == 3: